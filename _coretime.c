@@ -0,0 +1,186 @@
+/*
+ * _coretime: C kernel for simulate_market.
+ *
+ * Runs every auction round plus the reserve-price update in a single call,
+ * so a whole simulation costs one Python -> C transition. Inputs and outputs
+ * are C-contiguous float64 buffers (e.g. numpy arrays); outputs are filled
+ * in place. Bid prices come in whole price units (cents, scaled by
+ * price_scale) and p_clear is returned unscaled.
+ *
+ * Build next to coretime_market.py with:
+ *   cc -O3 -shared -fPIC $(python3-config --includes) _coretime.c \
+ *      -o _coretime$(python3-config --extension-suffix) -lm
+ */
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <float.h>
+#include <math.h>
+#include <stdlib.h>
+#include <string.h>
+
+/* Same tolerance as coretime_market._CENT_EPS */
+#define CENT_EPS 1e-6
+
+typedef struct {
+    double price;
+    double qty;
+} bid_t;
+
+/* price desc; ties are left unordered (see coretime_market._weighted_select) */
+static int
+bid_cmp(const void *a, const void *b)
+{
+    const bid_t *x = (const bid_t *)a;
+    const bid_t *y = (const bid_t *)b;
+    if (x->price != y->price)
+        return x->price > y->price ? -1 : 1;
+    return 0;
+}
+
+static int
+get_buffer(PyObject *obj, Py_buffer *view, int ndim, int writable, const char *name)
+{
+    int flags = PyBUF_C_CONTIGUOUS | PyBUF_FORMAT;
+    if (writable)
+        flags |= PyBUF_WRITABLE;
+    if (PyObject_GetBuffer(obj, view, flags) < 0)
+        return -1;
+    if (view->ndim != ndim || view->itemsize != sizeof(double)
+            || view->format == NULL || strcmp(view->format, "d") != 0) {
+        PyErr_Format(PyExc_ValueError,
+                     "%s must be a %d-D C-contiguous float64 buffer", name, ndim);
+        PyBuffer_Release(view);
+        return -1;
+    }
+    return 0;
+}
+
+static PyObject *
+simulate_market_c(PyObject *self, PyObject *args)
+{
+    PyObject *qty_obj, *price_obj, *supply_obj;
+    PyObject *reserve_obj, *p_clear_obj, *capacity_obj, *sold_obj;
+    double rp, premium, desired, k, p_min, price_scale;
+    Py_buffer bufs[7];
+    int n_bufs = 0;
+    bid_t *items = NULL;
+    PyObject *result = NULL;
+
+    if (!PyArg_ParseTuple(args, "OOOddddddOOOO",
+                          &qty_obj, &price_obj, &supply_obj,
+                          &rp, &premium, &desired, &k, &p_min, &price_scale,
+                          &reserve_obj, &p_clear_obj, &capacity_obj, &sold_obj))
+        return NULL;
+
+    PyObject *objs[7] = {qty_obj, price_obj, supply_obj,
+                         reserve_obj, p_clear_obj, capacity_obj, sold_obj};
+    const char *names[7] = {"qty", "price", "supply",
+                            "reserve", "p_clear", "capacity", "sold"};
+    for (int b = 0; b < 7; b++) {
+        if (get_buffer(objs[b], &bufs[b], b < 2 ? 2 : 1, b >= 3, names[b]) < 0)
+            goto done;
+        n_bufs++;
+    }
+
+    Py_ssize_t T = bufs[0].shape[0];
+    Py_ssize_t N = bufs[0].shape[1];
+    for (int b = 1; b < 7; b++) {
+        if (bufs[b].shape[0] != T || (b < 2 && bufs[b].shape[1] != N)) {
+            PyErr_Format(PyExc_ValueError, "%s has mismatched shape", names[b]);
+            goto done;
+        }
+    }
+
+    const double *qty = bufs[0].buf;
+    const double *price = bufs[1].buf;
+    const double *supply = bufs[2].buf;
+    double *reserve = bufs[3].buf;
+    double *p_clear = bufs[4].buf;
+    double *capacity = bufs[5].buf;
+    double *sold = bufs[6].buf;
+
+    items = PyMem_Malloc((N > 0 ? N : 1) * sizeof(bid_t));
+    if (items == NULL) {
+        PyErr_NoMemory();
+        goto done;
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    for (Py_ssize_t t = 0; t < T; t++) {
+        const double *q_row = qty + t * N;
+        const double *p_row = price + t * N;
+        /* Limits in whole cents: reserve rounded up, maximum rounded down */
+        double reserve_q = ceil(rp * price_scale - CENT_EPS);
+        double max_q = floor(rp * premium * price_scale + CENT_EPS);
+        if (max_q < reserve_q)
+            max_q = reserve_q;
+        Py_ssize_t n = 0;
+
+        /* Clamp to the maximum price, keep bids at or above reserve */
+        for (Py_ssize_t i = 0; i < N; i++) {
+            double p = p_row[i] < max_q ? p_row[i] : max_q;
+            if (p >= reserve_q && q_row[i] > 0) {
+                items[n].price = p;
+                items[n].qty = q_row[i];
+                n++;
+            }
+        }
+
+        p_clear[t] = 0.0;
+        capacity[t] = 0.0;
+        sold[t] = 0.0;
+        if (n > 0) {
+            qsort(items, (size_t)n, sizeof(bid_t), bid_cmp);
+            double cum = 0.0;
+            Py_ssize_t cross = -1;
+            for (Py_ssize_t j = 0; j < n; j++) {
+                cum += items[j].qty;
+                if (cross < 0 && cum >= supply[t])
+                    cross = j;
+            }
+            if (cross < 0)
+                cross = n - 1;
+            p_clear[t] = items[cross].price / price_scale;
+            capacity[t] = cum / supply[t];
+            sold[t] = cum < supply[t] ? cum : supply[t];
+        }
+
+        /* Same update as adjust_reserve_price */
+        double x = k * (capacity[t] - desired);
+        double p_new = rp * (x > log(DBL_MAX) ? HUGE_VAL : exp(x));
+        if (capacity[t] >= 1.0 && p_new < rp + 100)
+            p_new = rp + 100;
+        rp = p_new > p_min ? p_new : p_min;
+
+        /* Reserve after this round's update, as in the app's history */
+        reserve[t] = rp;
+    }
+    Py_END_ALLOW_THREADS
+
+    result = Py_None;
+    Py_INCREF(result);
+
+done:
+    PyMem_Free(items);
+    for (int b = 0; b < n_bufs; b++)
+        PyBuffer_Release(&bufs[b]);
+    return result;
+}
+
+static PyMethodDef coretime_methods[] = {
+    {"simulate_market_c", simulate_market_c, METH_VARARGS,
+     "simulate_market_c(qty, price, supply, rp0, premium, desired, k, p_min, price_scale,\n"
+     "                  reserve, p_clear, capacity, sold)\n\n"
+     "Run all rounds of simulate_market, filling the four output buffers."},
+    {NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef coretime_module = {
+    PyModuleDef_HEAD_INIT, "_coretime", NULL, -1, coretime_methods
+};
+
+PyMODINIT_FUNC
+PyInit__coretime(void)
+{
+    return PyModule_Create(&coretime_module);
+}
@@ -1,83 +1,132 @@
+import logging
+import math
+import sys
+from collections import namedtuple
+
 import numpy as np
 import pandas as pd
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional; fall back to plain Python
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
+
+try:
+    from _coretime import simulate_market_c
+except ImportError:  # C kernel not built; simulate_market uses _simulate
+    simulate_market_c = None
+
+logger = logging.getLogger(__name__)
+
+# Shared generator for tie-breaking timings
+_rng = np.random.default_rng()
+
+# Prices are quoted in steps of 0.01; every auction path works on whole cents,
+# held exactly in float64 so an inf bid still caps and quantities stay as given
+PRICE_SCALE = 100
+
+# Tolerance (in cents) for float error when rounding price limits to cents
+_CENT_EPS = 1e-6
+
+# _limits_in_cents: reserve rounded up and maximum price rounded down to whole
+# cents, so quantizing never admits a bid below the reserve or above the cap
+@njit(cache=True)
+def _limits_in_cents(reserve_price, max_price):
+    reserve_q = np.ceil(reserve_price * PRICE_SCALE - _CENT_EPS)
+    max_q = np.floor(max_price * PRICE_SCALE + _CENT_EPS)
+    # Cap and reserve within the same cent (e.g. premium 1.0): bids clear at the reserve
+    return reserve_q, np.maximum(max_q, reserve_q)
+
+# Bids as parallel column arrays (structure of arrays), one entry per bidder
+BidArrays = namedtuple('BidArrays', ['player_id', 'quantity', 'price', 'timing'])
+
 # 1) parse_bids: adds player_id and random timing for tie-breaking
 def parse_bids(raw_bids, player_ids):
     quantities, prices = raw_bids
-    timing = np.random.rand(len(player_ids))
-    return pd.DataFrame({
-        'player_id': player_ids,
-        'quantity':  quantities,
-        'price':      prices,
-        'timing':     timing
-    })
+    return BidArrays(
+        player_id=np.asarray(player_ids),
+        quantity=np.asarray(quantities),
+        price=np.rint(np.asarray(prices, dtype=float) * PRICE_SCALE),
+        timing=_rng.random(len(player_ids))
+    )
 
 # 2) compute_clearing_price: clamp bids above reserve * premium, discard below reserve
-def compute_clearing_price(bids, supply, reserve_price, premium):
-    df = bids.copy()
+def compute_clearing_price(bids, supply, reserve_price, max_price):
+    reserve_q, max_q = _limits_in_cents(reserve_price, max_price)
 
-    # Clamp any bids above reserve_price * premium
-    max_price = reserve_price * premium
-    too_high = df.loc[df['price'] > max_price, 'player_id'].tolist()
-    if too_high:
-        print(f"Warning: capped bids too-high from {too_high} to {max_price}")
-    df['price'] = df['price'].clip(upper=max_price)
+    # Clamp any bids above max_price (reserve_price * premium)
+    too_high = bids.price > max_q
+    if too_high.any():
+        logger.warning("capped bids too-high from %s to %s",
+                       bids.player_id[too_high].tolist(), max_price)
+    price = np.minimum(bids.price, max_q)
 
     # Keep only bids at or above reserve, with quantity > 0
-    valid = df[(df['price'] >= reserve_price) & (df['quantity'] > 0)].copy()
-    if valid.empty:
-        return 0.0, 0.0, valid
+    keep = (price >= reserve_q) & (bids.quantity > 0)
+    n_valid = int(keep.sum())
 
-    # Sort by price desc, timing asc for tie-breaking
-    valid.sort_values(['price', 'timing'], ascending=[False, True], inplace=True)
+    # Sort valid bids first, then by price desc, timing asc for tie-breaking,
+    # so each column is gathered once instead of masked and then reordered
+    order = np.lexsort((bids.timing, -price, ~keep))[:n_valid]
+    valid = BidArrays(
+        player_id=bids.player_id[order],
+        quantity=bids.quantity[order],
+        price=price[order],
+        timing=bids.timing[order]
+    )
+    if n_valid == 0:
+        return 0.0, 0.0, valid
 
     # Compute cumulative quantity to find clearing price
-    valid['cum_qty'] = valid['quantity'].cumsum()
-    crossing = valid['cum_qty'] >= supply
-    if not crossing.any():
-        p_clear = valid['price'].min()
-        cap = valid['cum_qty'].max() / supply
-        return p_clear, cap, valid
-
-    # Identify the first crossing bid
-    idx = crossing.idxmax()
-    p_clear = valid.at[idx, 'price']
-    cap = valid['cum_qty'].iat[-1] / supply
+    cum = np.cumsum(valid.quantity)
+    cap = cum[-1] / supply
+
+    # First crossing bid, or the lowest valid bid if demand falls short of supply
+    idx = min(int(np.searchsorted(cum, supply, side='left')), n_valid - 1)
+    p_clear = valid.price[idx] / PRICE_SCALE
     return p_clear, cap, valid
 
 # 3) allocate_cores: allocate in sorted order up to supply
 def allocate_cores(filtered_bids, supply, p_clear):
-    if filtered_bids.empty:
+    if len(filtered_bids.quantity) == 0:
         return pd.DataFrame(columns=['player_id','price','allocated']), 0, supply
 
-    remaining = supply
-    allocations = []
-    for _, row in filtered_bids.iterrows():
-        take = min(row['quantity'], remaining)
-        allocations.append({
-            'player_id': row['player_id'],
-            'price':      row['price'],
-            'allocated':  take
-        })
-        remaining -= take
-        if remaining <= 0:
-            break
-
-    alloc_df = pd.DataFrame(allocations)
-    sold = alloc_df['allocated'].sum()
+    qty = filtered_bids.quantity
+    pid = filtered_bids.player_id
+    price = filtered_bids.price
+
+    # First bid whose cumulative quantity meets supply is the last one served
+    cum = np.cumsum(qty)
+    k = int(np.searchsorted(cum, supply, side='left'))
+    before = np.concatenate(([0], cum[:-1]))
+    alloc = np.minimum(qty[:k+1], supply - before[:k+1])
+    alloc = np.maximum(alloc, 0)
+
+    alloc_df = pd.DataFrame({
+        'player_id': pid[:k+1],
+        'price':      price[:k+1] / PRICE_SCALE,
+        'allocated':  alloc
+    })
+    sold = alloc.sum()
     unsold = supply - sold
     return alloc_df, sold, unsold
 
 # 4) apply_premium: market price = clearing price * (1 + premium)
-def apply_premium(p_clear, premium):
-    return p_clear * (1 + premium)
+def apply_premium(p_clear, premium_plus_one):
+    return p_clear * premium_plus_one
 
 # 5) run_auction: one-shot auction
 def run_auction(raw_bids, player_ids, supply, reserve_price, premium):
-    bids_df = parse_bids(raw_bids, player_ids)
-    p_clear, cap, valid = compute_clearing_price(bids_df, supply, reserve_price, premium)
+    max_price = reserve_price * premium
+    premium_plus_one = 1.0 + premium
+
+    bids = parse_bids(raw_bids, player_ids)
+    p_clear, cap, valid = compute_clearing_price(bids, supply, reserve_price, max_price)
     alloc_df, sold, unsold = allocate_cores(valid, supply, p_clear)
-    p_market = apply_premium(p_clear, premium)
+    p_market = apply_premium(p_clear, premium_plus_one)
     return {
         'p_clear':     p_clear,
         'p_market':    p_market,
@@ -87,9 +136,208 @@ def run_auction(raw_bids, player_ids, supply, reserve_price, premium):
         'allocations': alloc_df
     }
 
+# Largest argument math.exp accepts without raising OverflowError
+_EXP_MAX = math.log(sys.float_info.max)
+
+# _exp: scalar exp that saturates to inf on overflow, like np.exp
+@njit(cache=True)
+def _exp(x):
+    if x > _EXP_MAX:
+        return math.inf
+    return math.exp(x)
+
 # 6) adjust_reserve_price: exponential-of-error update, floored at 1
+@njit(cache=True)
 def adjust_reserve_price(p_old, capacity, desired, k, p_min=1):
-    p_new = p_old * np.exp(k * (capacity - desired))
+    p_new = p_old * _exp(k * (capacity - desired))
     if capacity >= 1.0:
         p_new = max(p_new, p_old + 100)
     return max(p_new, p_min)
+
+# 7) _weighted_select: price of the bid whose cumulative quantity (price desc) first meets supply
+@njit(cache=True)
+def _weighted_select(price, qty, supply):
+    # QuickSelect on price, weighted by quantity: O(N) expected instead of a full
+    # sort. The crossing price does not depend on the order of equal-price bids,
+    # so no timing key is needed. Requires qty.sum() >= supply; reorders in place.
+    lo = 0
+    hi = price.size
+    need = supply
+    while hi - lo > 1:
+        pivot = price[lo + (hi - lo) // 2]
+
+        # Three-way partition of [lo, hi): > pivot, == pivot, < pivot
+        a = lo
+        i = lo
+        b = hi
+        while i < b:
+            if price[i] > pivot:
+                price[a], price[i] = price[i], price[a]
+                qty[a], qty[i] = qty[i], qty[a]
+                a += 1
+                i += 1
+            elif price[i] < pivot:
+                b -= 1
+                price[b], price[i] = price[i], price[b]
+                qty[b], qty[i] = qty[i], qty[b]
+            else:
+                i += 1
+
+        above = 0.0
+        for j in range(lo, a):
+            above += qty[j]
+        equal = 0.0
+        for j in range(a, b):
+            equal += qty[j]
+
+        if a > lo and above >= need:
+            hi = a
+        elif above + equal >= need or b == hi:
+            # b == hi: nothing below the pivot, so float rounding left need
+            # marginally unmet; the crossing is the lowest bid, i.e. the pivot
+            return pivot
+        else:
+            need -= above + equal
+            lo = b
+    return price[lo]
+
+# 8) _round: one auction round over a single row of bids, using caller-owned buffers
+@njit(cache=True)
+def _round(qty, price, supply, rp, max_price, price_buf, qty_buf):
+    # Prices and limits are in cents (see _limits_in_cents)
+    # Clamp and compact valid bids into price_buf / qty_buf
+    n = 0
+    total = 0.0
+    p_low = max_price
+    for i in range(qty.size):
+        p = min(price[i], max_price)
+        if p >= rp and qty[i] > 0:
+            price_buf[n] = p
+            qty_buf[n] = qty[i]
+            total += qty[i]
+            p_low = min(p_low, p)
+            n += 1
+    if n == 0:
+        return 0.0, 0.0, 0.0
+
+    # Without a crossing, clear at the lowest valid bid
+    if total < supply:
+        p_clear = p_low
+    else:
+        p_clear = _weighted_select(price_buf[:n], qty_buf[:n], supply)
+    return p_clear, total / supply, min(total, supply)
+
+# 9) _simulate: fused per-round auction + reserve update over stacked [T, N] bids
+@njit(cache=True)
+def _simulate(qty, price, supply, rp0, premium, desired, k, p_min):
+    T, N = qty.shape
+    reserve = np.empty(T)
+    p_clear = np.empty(T)
+    capacity = np.empty(T)
+    sold = np.empty(T)
+
+    # Scratch buffers shared by every round
+    price_buf = np.empty(N)
+    qty_buf = np.empty(N)
+
+    rp = rp0
+    for t in range(T):
+        reserve_q, max_q = _limits_in_cents(rp, rp * premium)
+        pc, capacity[t], sold[t] = _round(
+            qty[t], price[t], supply[t], reserve_q, max_q, price_buf, qty_buf
+        )
+        p_clear[t] = pc / PRICE_SCALE
+
+        rp = adjust_reserve_price(rp, capacity[t], desired, k, p_min)
+
+        # Reserve after this round's update, as in the app's history
+        reserve[t] = rp
+    return reserve, p_clear, capacity, sold
+
+# 10) simulate_market: replay many rounds with reserve-price feedback
+def simulate_market(raw_bids_list, supply, reserve_price, premium, desired, k, p_min=1):
+    T = len(raw_bids_list)
+    N = max((len(q) for q, _ in raw_bids_list), default=0)
+
+    # Pre-stack bids; rounds with fewer bidders are padded with zero-quantity bids
+    qty = np.zeros((T, N))
+    price = np.zeros((T, N))
+    for t, (q, p) in enumerate(raw_bids_list):
+        qty[t, :len(q)] = q
+        price[t, :len(p)] = p
+
+    # Kernels work on whole cents, as run_auction does; float64 storage holds
+    # them exactly and keeps fractional quantities in the same buffers
+    np.rint(price * PRICE_SCALE, out=price)
+    supply_vec = np.broadcast_to(np.asarray(supply, dtype=float), (T,)).copy()
+
+    params = (float(reserve_price), float(premium), float(desired), float(k), float(p_min))
+    if simulate_market_c is not None:
+        reserve, p_clear, capacity, sold = (np.empty(T) for _ in range(4))
+        simulate_market_c(qty, price, supply_vec, *params, float(PRICE_SCALE),
+                          reserve, p_clear, capacity, sold)
+    else:
+        reserve, p_clear, capacity, sold = _simulate(qty, price, supply_vec, *params)
+    return pd.DataFrame({
+        'round':         np.arange(1, T + 1),
+        'reserve_price': reserve,
+        'p_clear':       p_clear,
+        'capacity':      capacity,
+        'sold':          sold,
+        'unsold':        supply_vec - sold
+    })
+
+# 11) _crossing_price: row-wise price of the first bid whose cumulative quantity meets supply
+def _crossing_price(qty, price, supply):
+    order = np.argsort(-price, axis=1, kind='stable')
+    cum = np.cumsum(np.take_along_axis(qty, order, axis=1), axis=1)
+    crossing = cum >= supply[:, None]
+    idx = np.take_along_axis(order, crossing.argmax(axis=1)[:, None], axis=1)
+    return crossing.any(axis=1), np.take_along_axis(price, idx, axis=1)[:, 0]
+
+# 12) simulate_market_independent: clear T independent rounds at once over [T, N] bids
+def simulate_market_independent(qty, price, supply, rp, premium):
+    qty = np.asarray(qty, dtype=float)
+    price = np.asarray(price, dtype=float)
+    T, N = qty.shape
+    supply = np.broadcast_to(np.asarray(supply, dtype=float), (T,))
+    rp = np.broadcast_to(np.asarray(rp, dtype=float), (T,))
+
+    # Work in whole cents, as run_auction does
+    price = np.rint(price * PRICE_SCALE)
+    reserve_q, max_q = _limits_in_cents(rp, rp * premium)
+
+    # Clamp to each round's maximum price, mask out invalid bids
+    clipped = np.minimum(price, max_q[:, None])
+    keep = (clipped >= reserve_q[:, None]) & (qty > 0)
+    qty = np.where(keep, qty, 0.0)
+    clipped = np.where(keep, clipped, -np.inf)
+    total = qty.sum(axis=1)
+
+    # With whole-core bids the crossing lies within the top ceil(supply) bids,
+    # so partition those out and only sort them (no timing key; see _weighted_select)
+    K = min(N, int(np.ceil(supply.max()))) if T else N
+    if 0 < K < N:
+        top = np.argpartition(-clipped, K - 1, axis=1)[:, :K]
+        found, p_cross = _crossing_price(
+            np.take_along_axis(qty, top, axis=1),
+            np.take_along_axis(clipped, top, axis=1),
+            supply
+        )
+        # Fractional quantities can push the crossing past the top K
+        redo = ~found & (total >= supply)
+        if redo.any():
+            found[redo], p_cross[redo] = _crossing_price(qty[redo], clipped[redo], supply[redo])
+    else:
+        found, p_cross = _crossing_price(qty, clipped, supply)
+
+    # Decide on found, from the same cumsum as p_cross: total is summed in a
+    # different order and can reach supply when the sorted cumsum falls short.
+    # Rows without a crossing fall back as in _round
+    p_low = np.min(np.where(keep, clipped, np.inf), axis=1, initial=np.inf)
+    p_clear = np.where(found, p_cross, np.where(keep.any(axis=1), p_low, 0.0))
+    p_clear = p_clear / PRICE_SCALE
+
+    capacity = total / supply
+    sold = np.minimum(total, supply)
+    return p_clear, capacity, sold
@@ -1,8 +1,7 @@
 import streamlit as st
-import pandas as pd
+import polars as pl
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.ticker import MaxNLocator
+import altair as alt
 from coretime_market import run_auction, adjust_reserve_price
 
 # Title
@@ -23,15 +22,16 @@ if 'round' not in st.session_state:
     st.session_state.round = 0
     st.session_state.reserve_price = 1000.0
     st.session_state.initial_reserve = 1000.0
+    st.session_state.acc_revenue = 0.0
     # Seed history with initial point at round 0
-    st.session_state.history = pd.DataFrame([{  
+    st.session_state.history = [{
         'round': 0,
         'reserve_price': st.session_state.initial_reserve,
         'p_clear': 0.0,
         'capacity': 0.0,
         'sold': 0,
         'unsold': supply
-    }])
+    }]
 
 # Collect bids input
 st.write('Enter bids (quantity & price) for each player:')
@@ -67,18 +67,18 @@ if st.button('Submit Bids'):
     # Advance to next round
     st.session_state.round += 1
 
-    # Create a new DataFrame for the new row
-    new_row = pd.DataFrame([{
+    # Append the new row to history
+    st.session_state.history.append({
         'round':         st.session_state.round,
         'reserve_price': new_rp,
         'p_clear':       out['p_clear'],
         'capacity':      out['capacity'],
         'sold':          out['sold'],
         'unsold':        out['unsold']
-    }])
+    })
 
-    # Append to history using concat
-    st.session_state.history = pd.concat([st.session_state.history, new_row], ignore_index=True)
+    # Accumulate revenue incrementally rather than re-summing history
+    st.session_state.acc_revenue += float(out['p_clear'] * out['sold'])
 
     # Update reserve price AFTER appending
     st.session_state.reserve_price = new_rp
@@ -92,54 +92,40 @@ st.write(f"Current reserve price: {st.session_state.reserve_price:.3f}")
 current_max = st.session_state.reserve_price * (premium)
 st.write(f"Current maximum price: {current_max:.3f}")
 
-last_clear = st.session_state.history['p_clear'].iloc[-1]
+# Materialize history once for display and plotting
+df = pl.DataFrame(st.session_state.history, infer_schema_length=None)
+df = df.with_columns(pl.col('round').cast(pl.Int64))
+
+last_clear = df['p_clear'][-1]
 st.write(f"Last clearing price: {last_clear:.3f}")
 
 # accumulated revenue = sum over past (p_clear * sold)
-acc_revenue = (st.session_state.history['p_clear'] * 
-               st.session_state.history['sold']).sum()
-st.write(f"Accumulated revenue: {acc_revenue:.3f}")
+st.write(f"Accumulated revenue: {st.session_state.acc_revenue:.3f}")
 
 
-# Plot after first submission (history length > 1)
-if st.session_state.history.shape[0] > 1:
-    df = st.session_state.history.copy()
-    df['round'] = df['round'].astype(int)
-    # Create three subplots: clearing price, reserve price, capacity
-    fig, ax = plt.subplots(3, 1, figsize=(8, 9))
-    max_round = df['round'].max()
+# Line chart with fixed y-range, rendered client-side (no server-side figure)
+def history_chart(df, column, title, y_title, color, upper):
+    return alt.Chart(df, title=title).mark_line(point=True, color=color, clip=True).encode(
+        x=alt.X('round:Q', title='Round', axis=alt.Axis(tickMinStep=1),
+                scale=alt.Scale(domain=[0, int(df['round'].max())])),
+        y=alt.Y(f'{column}:Q', title=y_title, scale=alt.Scale(domain=[0, upper]))
+    )
 
+# Plot after first submission (history length > 1)
+if len(df) > 1:
     # Clearing price plot
     upper_clear = max(df['p_clear'].max(), st.session_state.initial_reserve * 20)
-    ax[0].plot(df['round'], df['p_clear'], marker='o', color='green')
-    ax[0].set_title('Clearing Price Over Time')
-    ax[0].set_xlabel('Round')
-    ax[0].set_ylabel('Clearing Price')
-    ax[0].set_ylim(0, upper_clear)
-    ax[0].set_xlim(0, max_round)
-    ax[0].xaxis.set_major_locator(MaxNLocator(integer=True))
-    ax[0].grid(True)
+    st.altair_chart(history_chart(
+        df, 'p_clear', 'Clearing Price Over Time', 'Clearing Price', 'green', upper_clear
+    ), use_container_width=True)
 
     # Reserve price plot
     upper_reserve = max(df['reserve_price'].max(), st.session_state.initial_reserve * 20)
-    ax[1].plot(df['round'], df['reserve_price'], marker='o', color='blue')
-    ax[1].set_title('Reserve Price Over Time')
-    ax[1].set_xlabel('Round')
-    ax[1].set_ylabel('Reserve Price')
-    ax[1].set_ylim(0, upper_reserve)
-    ax[1].set_xlim(0, max_round)
-    ax[1].xaxis.set_major_locator(MaxNLocator(integer=True))
-    ax[1].grid(True)
+    st.altair_chart(history_chart(
+        df, 'reserve_price', 'Reserve Price Over Time', 'Reserve Price', 'blue', upper_reserve
+    ), use_container_width=True)
 
     # Capacity usage plot
-    ax[2].plot(df['round'], df['capacity'], marker='o', color='orange')
-    ax[2].set_title('Capacity Usage Over Time')
-    ax[2].set_xlabel('Round')
-    ax[2].set_ylabel('Capacity (sold/supply)')
-    ax[2].set_ylim(0, 1)
-    ax[2].set_xlim(0, max_round)
-    ax[2].xaxis.set_major_locator(MaxNLocator(integer=True))
-    ax[2].grid(True)
-
-    plt.tight_layout()
-    st.pyplot(fig)
+    st.altair_chart(history_chart(
+        df, 'capacity', 'Capacity Usage Over Time', 'Capacity (sold/supply)', 'orange', 1
+    ), use_container_width=True)
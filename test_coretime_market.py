@@ -0,0 +1,180 @@
+import numpy as np
+import pytest
+
+import coretime_market as cm
+
+
+def _reference_round(qty, price, supply, rp, max_price):
+    # Sort-and-cumsum clearing, as in compute_clearing_price
+    p = np.minimum(price, max_price)
+    keep = (p >= rp) & (qty > 0)
+    q, p = qty[keep], p[keep]
+    if q.size == 0:
+        return 0.0, 0.0, 0.0
+    order = np.argsort(-p, kind='stable')
+    cum = np.cumsum(q[order])
+    idx = min(int(np.searchsorted(cum, supply, side='left')), q.size - 1)
+    return p[order][idx], cum[-1] / supply, min(cum[-1], supply)
+
+
+def test_round_matches_sort_reference_on_fractional_quantities():
+    rng = np.random.default_rng(0)
+    for _ in range(20000):
+        n = int(rng.integers(1, 8))
+        qty = np.round(rng.random(n), 1)
+        price = rng.choice([1100., 1200., 1300., 2500.], n)
+        # Offset by 0.05 so cumulative sums never land exactly on supply
+        supply = float(np.round(rng.random() * qty.sum() * 1.2, 1)) + 0.05
+        got = cm._round(qty, price, supply, 1000., 2000., np.empty(n), np.empty(n))
+        want = _reference_round(qty, price, supply, 1000., 2000.)
+        assert got[0] == want[0]
+        assert np.isclose(got[1], want[1]) and np.isclose(got[2], want[2])
+
+
+def test_round_exact_supply_with_float_rounding():
+    # Quantities sum to supply exactly on paper but not in floating point
+    qty = np.array([0.2, 0.9, 0.4, 0.1, 0.6])
+    price = np.array([1300., 1300., 1300., 1200., 1200.])
+    p_clear, _, _ = cm._round(qty, price, 2.2, 1000., 2000., np.empty(5), np.empty(5))
+    assert p_clear == 1200.
+
+
+def test_adjust_reserve_price_saturates_on_overflow():
+    # Demand far above supply pushes the exponent past what math.exp accepts
+    assert cm.adjust_reserve_price(1000, 500, 0.9, 2) == float('inf')
+
+
+def test_simulate_market_saturates_on_overflow():
+    bids = [(np.array([5000]), np.array([1500.]))] * 2
+    df = cm.simulate_market(bids, 10, 1000., 2., 0.9, 2.)
+    assert np.isinf(df['reserve_price'].iloc[0])
+
+
+def test_simulate_market_reserve_is_post_update():
+    rng = np.random.default_rng(2)
+    bids = [(rng.integers(0, 4, 5), rng.integers(5, 60, 5) * 100.0) for _ in range(50)]
+    df = cm.simulate_market(bids, 8, 1000., 2., 0.9, 2.)
+
+    # Same convention as streamlit_app.py: each row holds the updated reserve
+    rp = 1000.
+    for row in df.itertuples():
+        rp = cm.adjust_reserve_price(rp, row.capacity, 0.9, 2.)
+        assert np.isclose(row.reserve_price, rp)
+
+
+def test_c_kernel_matches_simulate():
+    _coretime = pytest.importorskip('_coretime')
+    rng = np.random.default_rng(1)
+    T, N = 300, 6
+    qty = rng.integers(0, 4, (T, N)).astype(float)
+    price = rng.integers(5, 60, (T, N)) * 100.0
+    supply = np.full(T, 8.0)
+    params = (1000., 2., 0.9, 2., 1.)
+
+    want = cm._simulate(qty, price, supply, *params)
+    got = tuple(np.empty(T) for _ in range(4))
+    _coretime.simulate_market_c(qty, price, supply, *params, float(cm.PRICE_SCALE), *got)
+    for g, w in zip(got, want):
+        np.testing.assert_allclose(g, w)
+
+
+def test_run_auction_respects_reserve_and_cap_at_cent_precision():
+    # Reserve is not a whole cent: a bid one fraction below must not clear
+    out = cm.run_auction((np.array([5]), np.array([165.29])), ['P1'], 5, 165.2912, 3.)
+    assert out['p_clear'] == 0.0
+
+    # Cap is 330.5862: the capped bid must clear at or below it
+    out = cm.run_auction((np.array([5]), np.array([330.59])), ['P1'], 5, 110.1954, 3.)
+    assert 110.1954 <= out['p_clear'] <= 330.5862
+
+
+def test_parse_bids_keeps_fractional_quantities():
+    bids = cm.parse_bids((np.array([1.5, 2.0]), np.array([10., 20.])), ['P1', 'P2'])
+    np.testing.assert_array_equal(bids.quantity, [1.5, 2.0])
+
+
+def test_run_auction_caps_infinite_bid():
+    out = cm.run_auction((np.array([5]), np.array([np.inf])), ['P1'], 5, 1000., 2.)
+    assert out['p_clear'] == 2000. and out['sold'] == 5
+
+
+def test_run_auction_with_unbounded_reserve():
+    out = cm.run_auction((np.array([5]), np.array([1500.])), ['P1'], 5, float('inf'), 2.)
+    assert out['p_clear'] == 0.0 and out['sold'] == 0
+
+
+def test_simulate_market_matches_run_auction():
+    rng = np.random.default_rng(3)
+    bids = [(rng.integers(0, 4, 5), np.round(rng.random(5) * 4000, 2)) for _ in range(100)]
+    df = cm.simulate_market(bids, 8, 1000., 2., 0.9, 1.)
+
+    rp = 1000.
+    for (qty, price), row in zip(bids, df.itertuples()):
+        out = cm.run_auction((qty, price), list(range(5)), 8, rp, 2.)
+        assert row.p_clear == out['p_clear']
+        assert row.sold == out['sold']
+        rp = cm.adjust_reserve_price(rp, out['capacity'], 0.9, 1.)
+        assert row.reserve_price == rp
+
+
+def test_premium_one_with_fractional_cent_reserve_still_clears():
+    # Reserve 1000.123 and cap 1000.123 share a cent; bids clear at the reserve
+    out = cm.run_auction((np.array([5]), np.array([2000.])), ['P1'], 10, 1000.123, 1.0)
+    assert out['p_clear'] == 1000.13 and out['sold'] == 5
+
+    bids = [(np.array([5]), np.array([2000.]))] * 20
+    df = cm.simulate_market(bids, 10, 1000.123, 1.0, 0.9, 2.)
+    assert (df['sold'] == 5).all()
+
+
+def test_simulate_market_independent_float_shortfall():
+    # total reaches supply, but the price-sorted cumsum falls just short
+    qty = np.array([[1.9, 1.1, 0.7, 0.5]])
+    price = np.array([[1200., 1100., 1400., 1100.]])
+    p_clear, _, _ = cm.simulate_market_independent(qty, price, 4.2, 1000., 2.)
+    out = cm.run_auction((qty[0], price[0]), list(range(4)), 4.2, 1000., 2.)
+    assert p_clear[0] == out['p_clear'] == 1100.
+
+
+def _assert_independent_matches_run_auction(qty, price, supply, rp, premium):
+    T, N = qty.shape
+    supply = np.broadcast_to(supply, (T,))
+    rp = np.broadcast_to(rp, (T,))
+    p_clear, capacity, sold = cm.simulate_market_independent(qty, price, supply, rp, premium)
+    for t in range(T):
+        out = cm.run_auction((qty[t], price[t]), list(range(N)), supply[t], rp[t], premium)
+        assert p_clear[t] == out['p_clear']
+        assert np.isclose(capacity[t], out['capacity'])
+        assert np.isclose(sold[t], out['sold'])
+
+
+def test_simulate_market_independent_whole_quantities_partitioned():
+    # supply 4 with 12 bidders takes the argpartition path (K < N)
+    rng = np.random.default_rng(4)
+    qty = rng.integers(0, 4, (300, 12)).astype(float)
+    price = np.round(rng.random((300, 12)) * 4000, 2)
+    _assert_independent_matches_run_auction(qty, price, 4, 1000., 2.)
+
+
+def test_simulate_market_independent_fractional_quantities():
+    # Quantities below one core push the crossing past the top K bids
+    rng = np.random.default_rng(5)
+    qty = np.round(rng.random((300, 12)) * 0.5, 1)
+    price = np.round(rng.random((300, 12)) * 4000, 2)
+    _assert_independent_matches_run_auction(qty, price, 2.05, 1000., 2.)
+
+
+def test_simulate_market_independent_rows_without_valid_bids():
+    qty = np.array([[0., 0., 0.], [2., 3., 1.], [1., 1., 1.]])
+    price = np.array([[1500., 1600., 1700.], [500., 900., 999.99], [1200., 1300., 1400.]])
+    _assert_independent_matches_run_auction(qty, price, 2, 1000., 2.)
+
+
+def test_simulate_market_independent_per_row_reserve_and_supply():
+    rng = np.random.default_rng(6)
+    T = 300
+    qty = rng.integers(0, 4, (T, 8)).astype(float)
+    price = np.round(rng.random((T, 8)) * 4000, 2)
+    supply = rng.integers(1, 12, T).astype(float)
+    rp = rng.random(T) * 1500 + 200
+    _assert_independent_matches_run_auction(qty, price, supply, rp, 2.)